@@ -9,16 +9,33 @@
 # - KPIs: Total Retail Sales, Retail Transfers, Warehouse Sales, Avg Monthly Sales
 # - Interactive charts: Monthly trend, Top Suppliers, Top Items, Retail vs Warehouse over time
 # - Download filtered data & KPI summary
-# - Lightweight libs: pandas, numpy, altair, streamlit
+# - Lightweight libs: pandas, numpy, polars, altair, streamlit
 
+import contextlib
 import io
-from typing import Dict
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 import pandas as pd
+import polars as pl
 import streamlit as st
 import altair as alt
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:  # pragma: no cover - pyarrow ships with streamlit
+    pa = None
+    pacsv = None
+
+try:
+    from numba import njit
+except ImportError:  # optional: group sums fall back to np.bincount
+    njit = None
+
 st.set_page_config(page_title="Sales Performance Dashboard", layout="wide")
 st.title("📊 Sales Performance Dashboard")
 
@@ -39,6 +56,46 @@ RENAME_MAP = {
     "WAREHOUSE SALES": "WAREHOUSE_SALES",
 }
 
+# Columns the filters, KPIs, charts and preview read; everything else is dropped
+KEEP_COLS = [
+    "YEAR", "MONTH", "MONTH_YEAR", "SUPPLIER", "ITEM_DESCRIPTION", "ITEM_TYPE",
+    "RETAIL_SALES", "RETAIL_TRANSFERS", "WAREHOUSE_SALES",
+]
+
+# Grain of the pre-aggregated cube behind the month and supplier charts. Items are
+# left out: with one row per item per month an item-level cube is as big as the data.
+CUBE_KEYS = ["YEAR", "MONTH_YEAR", "SUPPLIER", "ITEM_TYPE"]
+SALES_COLS = ["RETAIL_SALES", "RETAIL_TRANSFERS", "WAREHOUSE_SALES"]
+
+# Columns shown in the filtered data preview
+PREVIEW_COLS = [
+    "YEAR", "MONTH", "SUPPLIER", "ITEM_DESCRIPTION", "ITEM_TYPE",
+    "RETAIL_SALES", "RETAIL_TRANSFERS", "WAREHOUSE_SALES",
+]
+
+# Parse CSVs with PyArrow's multithreaded reader (set False to use pd.read_csv)
+USE_ARROW_CSV = True
+
+DEFAULT_CSV = "cleaned_warehouse_and_retail_sales.csv"
+# Columnar copy of DEFAULT_CSV written on first load, read instead of re-parsing
+DEFAULT_PARQUET = "cleaned_warehouse_and_retail_sales.parquet"
+
+# Column types applied at parse time by the Arrow reader (raw column names)
+ARROW_COLUMN_TYPES = {
+    "YEAR": "int16",
+    "MONTH": "int8",
+    "RETAIL SALES": "float32",
+    "RETAIL TRANSFERS": "float32",
+    "WAREHOUSE SALES": "float32",
+}
+
+
+def month_start(year, month) -> np.ndarray:
+    # First-of-month timestamps for aligned YEAR / MONTH values, built as months
+    # since 1970-01 so it is plain integer arithmetic plus a datetime64 cast
+    months = (np.asarray(year, dtype=np.int32) - 1970) * 12 + (np.asarray(month, dtype=np.int32) - 1)
+    return months.astype("datetime64[M]").astype("datetime64[ns]")
+
 
 def standardize_columns(df: pd.DataFrame) -> pd.DataFrame:
     cols = [c.strip().upper() for c in df.columns]
@@ -50,70 +107,242 @@ def standardize_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def read_sales_csv(path) -> pd.DataFrame:
+    if USE_ARROW_CSV and pacsv is not None:
+        try:
+            convert = pacsv.ConvertOptions(
+                column_types={c: pa.type_for_alias(t) for c, t in ARROW_COLUMN_TYPES.items()},
+                strings_can_be_null=True,  # blank fields are missing, as with pd.read_csv
+            )
+            return pacsv.read_csv(path, convert_options=convert).to_pandas(types_mapper=pd.ArrowDtype)
+        except pa.ArrowInvalid:
+            # Dirty values the typed reader rejects: let pandas coerce them in preprocess
+            if hasattr(path, "seek"):
+                path.seek(0)
+    return pd.read_csv(path)
+
+
+def _parquet_is_fresh() -> bool:
+    if not os.path.exists(DEFAULT_PARQUET):
+        return False
+    # Rebuild when the CSV has been replaced since the Parquet copy was written
+    return not os.path.exists(DEFAULT_CSV) or os.path.getmtime(DEFAULT_PARQUET) >= os.path.getmtime(DEFAULT_CSV)
+
+
 @st.cache_data(show_spinner=False)
 def load_default_data() -> pd.DataFrame:
+    if _parquet_is_fresh():
+        try:
+            return pd.read_parquet(DEFAULT_PARQUET, engine="pyarrow", dtype_backend="pyarrow")
+        except Exception:
+            pass  # unreadable cache copy (e.g. truncated): rebuild it from the CSV
     try:
-        df = pd.read_csv("cleaned_warehouse_and_retail_sales.csv")
+        df = standardize_columns(read_sales_csv(DEFAULT_CSV))
     except Exception:
         df = pd.read_csv("E:\projects for core statistics in data science\sales_performance_dashboard\Warehouse_and_Retail_Sales.csv")
-    df = standardize_columns(df)
+        return standardize_columns(df)
+    # Write beside the target and rename into place, so a crash or a concurrent
+    # run never leaves a partial file at DEFAULT_PARQUET
+    tmp_path = f"{DEFAULT_PARQUET}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp_path, engine="pyarrow", compression="zstd", index=False)
+        os.replace(tmp_path, DEFAULT_PARQUET)
+    except Exception:
+        # Read-only checkout, no pyarrow, or mixed-type object columns Arrow can't
+        # store: keep serving from the CSV
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
     return df
 
 
 @st.cache_data(show_spinner=False)
-def preprocess(df: pd.DataFrame) -> pd.DataFrame:
-    df = standardize_columns(df.copy())
-
-    # Validate presence of required columns (allow subset but must have sales + year/month)
-    missing = [c for c in ["YEAR", "MONTH", "RETAIL SALES", "RETAIL_SALES", "WAREHOUSE SALES", "WAREHOUSE_SALES"] if c not in df.columns]
-    # After standardize, either with spaces or underscores may exist; handle both
-
-    # Ensure numeric types for sales
-    for col in ["RETAIL_SALES", "RETAIL TRANSFERS", "RETAIL_TRANSFERS", "WAREHOUSE_SALES", "RETAIL SALES", "RETAIL TRANSFERS", "WAREHOUSE SALES"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    # Coalesce dual-named columns into underscore versions
-    if "RETAIL SALES" in df.columns and "RETAIL_SALES" not in df.columns:
-        df.rename(columns={"RETAIL SALES": "RETAIL_SALES"}, inplace=True)
-    if "RETAIL TRANSFERS" in df.columns and "RETAIL_TRANSFERS" not in df.columns:
-        df.rename(columns={"RETAIL TRANSFERS": "RETAIL_TRANSFERS"}, inplace=True)
-    if "WAREHOUSE SALES" in df.columns and "WAREHOUSE_SALES" not in df.columns:
-        df.rename(columns={"WAREHOUSE SALES": "WAREHOUSE_SALES"}, inplace=True)
-
-    # Category-like cols
-    for c in ["SUPPLIER", "ITEM_CODE", "ITEM_DESCRIPTION", "ITEM_TYPE"]:
-        if c in df.columns:
-            df[c] = df[c].astype("category")
-
-    # Fill missing sales with 0 (safer for aggregation)
-    for c in ["RETAIL_SALES", "RETAIL_TRANSFERS", "WAREHOUSE_SALES"]:
+def preprocess(df: pd.DataFrame, full: bool = False) -> pd.DataFrame:
+    # Expects standardize_columns to have run already (load_default_data / upload branch).
+    # `df` is the caller's per-run copy, so it is updated in place rather than copied again.
+
+    # Numeric sales as NumPy float32 (halves the bytes every sum reads). Cast before
+    # filling: coerced values in Arrow-backed columns are NaN, which fillna there skips.
+    # Missing sales become 0 (safer for aggregation).
+    for c in SALES_COLS:
         if c in df.columns:
-            df[c] = df[c].fillna(0)
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(np.float32).fillna(0)
 
     # Month-Year label for plotting
     if "YEAR" in df.columns and "MONTH" in df.columns:
         # Keep MONTH as int 1-12 if possible
         df["YEAR"] = pd.to_numeric(df["YEAR"], errors="coerce").astype("Int64")
         df["MONTH"] = pd.to_numeric(df["MONTH"], errors="coerce").astype("Int64")
-        # Construct a label like 2023-01
+        # Out-of-range months would wrap in the int8 cast and roll over in month_start
+        df["MONTH"] = df["MONTH"].where(df["MONTH"].between(1, 12))
         df = df.dropna(subset=["YEAR", "MONTH"]).copy()
-        df["MONTH_YEAR"] = pd.to_datetime(
-            dict(year=df["YEAR"].astype(int), month=df["MONTH"].astype(int), day=1)
-        ).dt.to_period("M").astype(str)
+        df["YEAR"] = df["YEAR"].astype(np.int16)
+        df["MONTH"] = df["MONTH"].astype(np.int8)
+        if full:
+            # The CSV download exports MONTH_YEAR as a first-of-month date
+            df["MONTH_YEAR"] = month_start(df["YEAR"], df["MONTH"])
+        else:
+            # Integer key like 202301 for grouping; charts get timestamps from the aggregates
+            df["MONTH_YEAR"] = df["YEAR"].astype(np.int32) * 100 + df["MONTH"].astype(np.int32)
+
+    # Category-like cols; built after rows are dropped so every category is observed
+    for c in ["SUPPLIER", "ITEM_CODE", "ITEM_DESCRIPTION", "ITEM_TYPE"]:
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+
+    if full:
+        return df
+    return df[[c for c in KEEP_COLS if c in df.columns]]
+
+
+def _group_sum_numpy(codes: np.ndarray, weights: np.ndarray, k: int):
+    valid = codes >= 0  # -1 marks a missing key, which groupby drops too
+    codes, weights = codes[valid], weights[valid]
+    return np.bincount(codes, weights=weights, minlength=k), np.bincount(codes, minlength=k)
+
+
+if njit is not None:
+    @njit(cache=True, nogil=True)
+    def group_sum(codes, weights, k):
+        # Per-group sums and row counts in a single pass with no temporaries
+        sums = np.zeros(k)
+        counts = np.zeros(k, dtype=np.int64)
+        for i in range(codes.size):
+            c = codes[i]
+            if c >= 0:
+                sums[c] += weights[i]
+                counts[c] += 1
+        return sums, counts
+else:
+    group_sum = _group_sum_numpy
 
-    return df
 
+def _top_n_by_code(df: pd.DataFrame, key: str, val: str, n: int = 10) -> pd.DataFrame:
+    # Category codes are dense ints in [0, K), so group_sum covers every group
+    # in one pass; argpartition then picks the N largest without a full sort
+    col = df[key]
+    cats = col.cat.categories
+    codes = col.cat.codes.to_numpy(dtype=np.int32)
+    weights = df[val].to_numpy(dtype=np.float32)
+    sums, counts = group_sum(codes, weights, len(cats))
+    observed = np.flatnonzero(counts)
+    if len(observed) > n:
+        observed = observed[np.argpartition(-sums[observed], n - 1)[:n]]
+    idx = observed[np.argsort(-sums[observed], kind="stable")]
+    # float64 sums rounded to cents, so float32 noise doesn't reach the tooltips
+    return pd.DataFrame({key: cats[idx], val: np.round(sums[idx], 2)})
+
+
+def apply_filters(df: pd.DataFrame, year_sel, supplier_sel, type_sel) -> pd.DataFrame:
+    # One combined boolean mask, applied once, instead of a frame copy per filter
+    masks = []
+    if year_sel:
+        masks.append(df["YEAR"].isin(year_sel).to_numpy())
+    if supplier_sel and "SUPPLIER" in df.columns:
+        masks.append(df["SUPPLIER"].isin(supplier_sel).to_numpy())
+    if type_sel and "ITEM_TYPE" in df.columns:
+        masks.append(df["ITEM_TYPE"].isin(type_sel).to_numpy())
+    if not masks:
+        return df
+    mask = np.logical_and.reduce(masks)
+    # Callers only read from the result, so an all-True mask can skip the copy
+    return df if mask.all() else df.loc[mask]
+
+
+def _with_month_ts(agg: pd.DataFrame) -> pd.DataFrame:
+    # Swap the integer MONTH_YEAR key of an aggregate for its timestamp (few rows)
+    key = agg.pop("MONTH_YEAR")
+    agg.insert(0, "MONTH_YEAR_TS", month_start(key // 100, key % 100))
+    return agg
+
+
+def supplier_agg(filtered: pd.DataFrame) -> pd.DataFrame:
+    return _top_n_by_code(filtered, "SUPPLIER", "RETAIL_SALES")
+
+
+def item_agg(filtered: pd.DataFrame) -> pd.DataFrame:
+    return _top_n_by_code(filtered, "ITEM_DESCRIPTION", "RETAIL_SALES")
+
+
+@st.cache_data(show_spinner=False)
+def build_cube(_df: pd.DataFrame, data_key) -> pd.DataFrame:
+    # Sales summed per CUBE_KEYS combination; filtering then re-aggregating it
+    # gives the same month and supplier totals as the fact rows
+    keys = [c for c in CUBE_KEYS if c in _df.columns]
+    vals = [c for c in SALES_COLS if c in _df.columns]
+    return _df.groupby(keys, observed=True, dropna=False)[vals].sum().reset_index()
+
+
+def month_aggs(filtered: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # A single group-by sums both channels; the trend chart reuses its RETAIL_SALES column.
+    # Sums are float64 rounded to cents so float32 noise doesn't reach the tooltips.
+    compare = (
+        pl.from_pandas(filtered[["MONTH_YEAR", "RETAIL_SALES", "WAREHOUSE_SALES"]])
+        .lazy()
+        .group_by("MONTH_YEAR")
+        .agg(pl.col("RETAIL_SALES", "WAREHOUSE_SALES").cast(pl.Float64).sum().round(2))
+        .sort("MONTH_YEAR")
+        .collect()
+        .to_pandas()
+    )
+    compare = _with_month_ts(compare)
+    return compare[["MONTH_YEAR_TS", "RETAIL_SALES"]], compare
+
+
+@st.cache_data(show_spinner=False)
+def chart_aggregates(_df: pd.DataFrame, data_key, years: tuple, suppliers: tuple, types: tuple) -> Dict[str, pd.DataFrame]:
+    # `_df` is left unhashed (leading underscore); `data_key` identifies the source
+    # data, so repeat filter selections are served from the cache
+    selection = (list(years), list(suppliers), list(types))
+    cube = apply_filters(build_cube(_df, data_key), *selection)
+    # The aggregations are independent and their kernels (Polars, Numba nogil)
+    # release the GIL, so they run side by side on worker threads
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        if "MONTH_YEAR" in cube.columns:
+            jobs["month"] = pool.submit(month_aggs, cube)
+        if "SUPPLIER" in cube.columns:
+            jobs["top_suppliers"] = pool.submit(supplier_agg, cube)
+        if "ITEM_DESCRIPTION" in _df.columns:
+            jobs["top_items"] = pool.submit(item_agg, apply_filters(_df, *selection))
+    aggs = {name: job.result() for name, job in jobs.items() if name != "month"}
+    if "month" in jobs:
+        aggs["monthly_sales"], aggs["compare"] = jobs["month"].result()
+    return aggs
+
+
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    if pacsv is not None:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # Timestamps as YYYY-MM-DD, as DataFrame.to_csv writes them, not ns-padded datetimes
+        for i, field in enumerate(table.schema):
+            if pa.types.is_timestamp(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(pa.date32()))
+        pacsv.write_csv(table, buf)
+    else:
+        df.to_csv(buf, index=False)
+    return buf.getvalue()
+
+
+@st.cache_data(show_spinner=False)
+def filtered_csv(_raw: pd.DataFrame, data_key, years: tuple, suppliers: tuple, types: tuple) -> bytes:
+    # The download keeps every column, so it re-runs preprocess without the projection
+    df = preprocess(_raw, full=True)
+    return to_csv_bytes(apply_filters(df, list(years), list(suppliers), list(types)))
+
+
+def kpi_block(filtered: pd.DataFrame, monthly_sales: Optional[pd.DataFrame] = None) -> Dict[str, float]:
+    def total(col: str) -> float:
+        # Plain NumPy reduction (sales are NaN-free float32), accumulated in float64
+        return float(filtered[col].to_numpy().sum(dtype=np.float64)) if col in filtered.columns else 0.0
 
-def kpi_block(filtered: pd.DataFrame) -> Dict[str, float]:
     kpis = {}
-    kpis["Total Retail Sales"] = float(filtered.get("RETAIL_SALES", pd.Series([0])).sum())
-    kpis["Total Retail Transfers"] = float(filtered.get("RETAIL_TRANSFERS", pd.Series([0])).sum())
-    kpis["Total Warehouse Sales"] = float(filtered.get("WAREHOUSE_SALES", pd.Series([0])).sum())
-    # Avg monthly retail sales
-    if "MONTH_YEAR" in filtered.columns:
-        monthly = filtered.groupby("MONTH_YEAR")["RETAIL_SALES"].sum()
-        kpis["Avg Monthly Retail Sales"] = float(monthly.mean()) if len(monthly) else 0.0
+    kpis["Total Retail Sales"] = total("RETAIL_SALES")
+    kpis["Total Retail Transfers"] = total("RETAIL_TRANSFERS")
+    kpis["Total Warehouse Sales"] = total("WAREHOUSE_SALES")
+    # Avg monthly retail sales, reusing the trend chart's monthly totals
+    if monthly_sales is not None and len(monthly_sales):
+        kpis["Avg Monthly Retail Sales"] = float(monthly_sales["RETAIL_SALES"].mean())
     else:
         kpis["Avg Monthly Retail Sales"] = 0.0
     return kpis
@@ -129,12 +358,14 @@ with st.sidebar:
 if use_upload:
     uploaded = st.file_uploader("Upload CSV", type=["csv"])
     if uploaded is not None:
-        raw = pd.read_csv(uploaded)
+        raw = standardize_columns(read_sales_csv(uploaded))
+        data_key = uploaded.file_id
     else:
         st.info("Upload a CSV to proceed or turn off upload to use local data.")
         st.stop()
 else:
     raw = load_default_data()
+    data_key = DEFAULT_CSV
 
 # Preprocess
 _df = preprocess(raw)
@@ -153,31 +384,28 @@ with st.sidebar:
 
     # Supplier filter
     if "SUPPLIER" in _df.columns:
-        suppliers = sorted(list(_df["SUPPLIER"].astype(str).unique()))
+        suppliers = sorted(_df["SUPPLIER"].cat.categories.tolist())
         supplier_sel = st.multiselect("Supplier", options=suppliers, default=suppliers[:10])
     else:
         supplier_sel = []
 
     # Item Type filter
     if "ITEM_TYPE" in _df.columns:
-        types = sorted(list(_df["ITEM_TYPE"].astype(str).unique()))
+        types = sorted(_df["ITEM_TYPE"].cat.categories.tolist())
         type_sel = st.multiselect("Item Type", options=types, default=types)
     else:
         type_sel = []
 
 # Apply filters
-filtered = _df.copy()
-if year_sel:
-    filtered = filtered[filtered["YEAR"].isin(year_sel)]
-if supplier_sel and "SUPPLIER" in filtered.columns:
-    filtered = filtered[filtered["SUPPLIER"].astype(str).isin(supplier_sel)]
-if type_sel and "ITEM_TYPE" in filtered.columns:
-    filtered = filtered[filtered["ITEM_TYPE"].astype(str).isin(type_sel)]
+filtered = apply_filters(_df, year_sel, supplier_sel, type_sel)
+# Hashable form of the selections, used as the cache key for derived results
+selection = (tuple(sorted(year_sel)), tuple(sorted(supplier_sel)), tuple(sorted(type_sel)))
 
 # -----------------------------
 # KPIs
 # -----------------------------
-kpis = kpi_block(filtered)
+aggs = chart_aggregates(_df, data_key, *selection)
+kpis = kpi_block(filtered, aggs.get("monthly_sales"))
 
 kpi_cols = st.columns(4)
 for i, (k, v) in enumerate(kpis.items()):
@@ -189,23 +417,19 @@ st.markdown("---")
 # -----------------------------
 # Charts
 # -----------------------------
-# Ensure datetime conversion
-if "MONTH_YEAR" in filtered.columns:
-    filtered["MONTH_YEAR"] = pd.to_datetime(filtered["MONTH_YEAR"])
-
 # 1) Monthly Retail Sales Trend
-if "MONTH_YEAR" in filtered.columns:
-    monthly_sales = filtered.groupby("MONTH_YEAR", as_index=False)["RETAIL_SALES"].sum()
+if "monthly_sales" in aggs:
+    monthly_sales = aggs["monthly_sales"]
     chart1 = (
         alt.Chart(monthly_sales)
         .mark_line(point=True)
         .encode(
-            x=alt.X("MONTH_YEAR:T", title="Month-Year"),
+            x=alt.X("MONTH_YEAR_TS:T", title="Month-Year"),
             y=alt.Y("RETAIL_SALES:Q", title="Retail Sales"),
-            tooltip=["MONTH_YEAR", alt.Tooltip("RETAIL_SALES:Q", format=",")]
+            tooltip=[alt.Tooltip("MONTH_YEAR_TS:T", title="Month-Year", format="%Y-%m"),
+                     alt.Tooltip("RETAIL_SALES:Q", format=",")]
         )
         .properties(height=320)
-        .interactive()
     )
     st.subheader("📈 Monthly Retail Sales Trend")
     st.altair_chart(chart1, use_container_width=True)
@@ -213,11 +437,8 @@ else:
     st.warning("MONTH_YEAR column not available for trend chart.")
 
 # 2) Top 10 Suppliers by Retail Sales
-if "SUPPLIER" in filtered.columns:
-    top_suppliers = (
-        filtered.groupby("SUPPLIER", as_index=False)["RETAIL_SALES"]
-        .sum()
-        .nlargest(10, "RETAIL_SALES"))
+if "top_suppliers" in aggs:
+    top_suppliers = aggs["top_suppliers"]
     chart2 = (
         alt.Chart(top_suppliers)
         .mark_bar()
@@ -232,13 +453,8 @@ if "SUPPLIER" in filtered.columns:
     st.altair_chart(chart2, use_container_width=True)
 
 # 3) Top 10 Items by Retail Sales
-filtered["ITEM_DESCRIPTION"] = filtered["ITEM_DESCRIPTION"].astype(str)
-if "ITEM_DESCRIPTION" in filtered.columns:
-    top_items = (
-        filtered.groupby("ITEM_DESCRIPTION", as_index=False)["RETAIL_SALES"]
-        .sum()
-        .nlargest(10, "RETAIL_SALES")
-    )
+if "top_items" in aggs:
+    top_items = aggs["top_items"]
     chart3 = (
         alt.Chart(top_items)
         .mark_bar()
@@ -253,24 +469,20 @@ if "ITEM_DESCRIPTION" in filtered.columns:
     st.altair_chart(chart3, use_container_width=True)
 
 # 4) Retail vs Warehouse Sales Over Time
-if "MONTH_YEAR" in filtered.columns:
-    compare = (
-        filtered.groupby("MONTH_YEAR", as_index=False)[["RETAIL_SALES", "WAREHOUSE_SALES"]]
-        .sum()
-        .sort_values("MONTH_YEAR")
-    )
-    compare_melt = compare.melt("MONTH_YEAR", var_name="Channel", value_name="Sales")
+if "compare" in aggs:
+    compare = aggs["compare"]
+    compare_melt = compare.melt("MONTH_YEAR_TS", var_name="Channel", value_name="Sales")
     chart4 = (
         alt.Chart(compare_melt)
         .mark_line(point=True)
         .encode(
-            x=alt.X("MONTH_YEAR:T", title="Month-Year"),
+            x=alt.X("MONTH_YEAR_TS:T", title="Month-Year"),
             y=alt.Y("Sales:Q", title="Sales"),
             color="Channel:N",
-            tooltip=["MONTH_YEAR", "Channel", alt.Tooltip("Sales:Q", format=",")]
+            tooltip=[alt.Tooltip("MONTH_YEAR_TS:T", title="Month-Year", format="%Y-%m"),
+                     "Channel", alt.Tooltip("Sales:Q", format=",")]
         )
         .properties(height=320)
-        .interactive()
     )
     st.subheader("📊 Retail vs Warehouse Sales Over Time")
     st.altair_chart(chart4, use_container_width=True)
@@ -282,14 +494,13 @@ st.markdown("---")
 # Data preview and downloads
 # -----------------------------
 st.subheader("Filtered Data Preview")
-st.dataframe(filtered.head(1000))
+preview = filtered.head(1000)
+st.dataframe(preview[[c for c in PREVIEW_COLS if c in preview.columns]], width="stretch")
 
-# Download filtered data
-csv_buf = io.StringIO()
-filtered.to_csv(csv_buf, index=False)
+# Download filtered data (encoded only when the button is clicked)
 st.download_button(
     label="⬇️ Download Filtered CSV",
-    data=csv_buf.getvalue(),
+    data=partial(filtered_csv, raw, data_key, *selection),
     file_name="filtered_sales.csv",
     mime="text/csv",
 )